@@ -1,22 +1,51 @@
 """FastAPI application for workout training"""
 
-import json
+import asyncio
+from collections import defaultdict
+from collections.abc import Iterator
 from datetime import date as date_type
+from itertools import chain, islice
+from operator import itemgetter
 import os
 from pathlib import Path
-from fastapi import FastAPI
+import anyio
+import orjson
+from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from shared.schemas import WorkoutLog
 from repositories.local_workout_repository import LocalWorkoutRepository
 
 # Create repository instance
 repo = LocalWorkoutRepository(base_dir="local_storage")
 
+# Upper bound on workout files read concurrently by a single request
+MAX_CONCURRENT_READS = 64
+# Workout files read per batch while searching for an exercise's last performance
+LAST_EXERCISE_PAGE_SIZE = 16
+# Workout summaries encoded per chunk of a streamed listing response
+STREAM_CHUNK_SIZE = 256
+
+# Static exercise catalogue, parsed once at import instead of on every request
+EXERCISES_FILE = Path(__file__).resolve().parent.parent / "shared" / "data" / "exercises.json"
+_EXERCISES: list[dict] = orjson.loads(EXERCISES_FILE.read_bytes())
+
+# Inverted indices for the /exercises filters: value -> positions in _EXERCISES
+_IDX_EQUIPMENT: dict[str, set[int]] = defaultdict(set)
+_IDX_MUSCLE: dict[str, set[int]] = defaultdict(set)
+_IDX_LEVEL: dict[str, set[int]] = defaultdict(set)
+for _i, _ex in enumerate(_EXERCISES):
+    _IDX_EQUIPMENT[_ex.get("equipment")].add(_i)
+    for _muscle in _ex.get("primaryMuscles", []):
+        _IDX_MUSCLE[_muscle].add(_i)
+    _IDX_LEVEL[_ex.get("level")].add(_i)
+
 
 app = FastAPI(
     title="Workout Training API",
     description="API for logging and analyzing workout training sessions",
-    version="0.1.0"
+    version="0.1.0",
+    default_response_class=ORJSONResponse,
 )
 
 # Enable CORS for all origins (for development purposes)
@@ -40,7 +69,10 @@ def root():
 def create_workout(workout: WorkoutLog):
     """Endpoint to log a new workout session"""
 
-    file_path = repo.save(workout)
+    try:
+        file_path = repo.save(workout)
+    except ValueError as e:  # user_id that isn't a plain directory name
+        raise HTTPException(status_code=400, detail=str(e))
     
     return {
         "message": "Workout logged successfully",
@@ -50,78 +82,90 @@ def create_workout(workout: WorkoutLog):
         "total_volume": workout.total_volume
     }
 
+def _subdirs(path: str | Path) -> list[os.DirEntry]:
+    """Directory entries directly under path"""
+    with os.scandir(path) as entries:
+        return [entry for entry in entries if entry.is_dir()]
+
+def _json_files(path: str | Path) -> list[os.DirEntry]:
+    """JSON file entries directly under path"""
+    with os.scandir(path) as entries:
+        return [entry for entry in entries if entry.name.endswith(".json")]
+
+def _load_workout_file(workout_file: str) -> dict:
+    """Read and decode a single workout file"""
+    with open(workout_file, "rb") as f:
+        return orjson.loads(f.read())
+
+async def _map_in_threads(func, items: list) -> list:
+    """Run func over items on the thread pool, a bounded number at a time, preserving order"""
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_READS)
+
+    async def run(item):
+        async with semaphore:
+            return await anyio.to_thread.run_sync(func, item)
+
+    return await asyncio.gather(*(run(item) for item in items))
+
+async def _load_workout_files(workout_files: list[str]) -> list[dict]:
+    """Read workout files concurrently on the thread pool, preserving order"""
+    return await _map_in_threads(_load_workout_file, workout_files)
+
+def _iter_json_array(items: list[dict]) -> Iterator[bytes]:
+    """Encode items as a JSON array, a chunk of STREAM_CHUNK_SIZE items at a time"""
+    yield b"["
+    for start in range(0, len(items), STREAM_CHUNK_SIZE):
+        chunk = b",".join(orjson.dumps(item) for item in items[start:start + STREAM_CHUNK_SIZE])
+        yield chunk if start == 0 else b"," + chunk
+    yield b"]"
+
 @app.get("/workouts")
-def get_all_workouts(user_id: str | None = None):
+async def get_all_workouts(user_id: str | None = None):
     """
     Get all workouts, optionally filtered by user.
     Returns list of workouts with summary info.
     """
-    workouts_dir = Path("local_storage/workouts")
+    workouts_dir = repo.workouts_dir
     
     # Check if directory exists
     if not workouts_dir.exists():
         return []
-    
-    all_workouts = []
-    
-    # Walk through user directories
-    for user_dir in workouts_dir.iterdir():
-        # Skip if filtering by user and this isn't the user
-        if user_id and user_dir.name != user_id:
-            continue
-            
-        if not user_dir.is_dir():
-            continue
-        
-        # Walk through year/month/day structure
-        for year_dir in user_dir.iterdir():
-            if not year_dir.is_dir():
-                continue
-            for month_dir in year_dir.iterdir():
-                if not month_dir.is_dir():
-                    continue
-                for workout_file in month_dir.glob("*.json"):
-                    # Read the workout file
-                    with open(workout_file, 'r') as f:
-                        workout_data = json.load(f)
-                    
-                    # Add summary info
-                    workout_summary = {
-                        "workout_date": workout_data["workout_date"],
-                        "user_id": workout_data["user_id"],
-                        "num_exercises": len(workout_data["exercises"]),
-                        "total_volume": sum(
-                            sum(s["reps"] * s["weight_lbs"] for s in ex["sets"])
-                            for ex in workout_data["exercises"]
-                        ),
-                        "exercises": [
-                            {
-                                "name": ex["name"],
-                                "num_sets": len(ex["sets"]),
-                                "max_weight": max(s["weight_lbs"] for s in ex["sets"]),
-                                "total_reps": sum(s["reps"] for s in ex["sets"])
-                            }
-                            for ex in workout_data["exercises"]
-                        ]
-                    }
-                    
-                    all_workouts.append(workout_summary)
+
+    if user_id:
+        user_ids = [user_id]
+    else:
+        user_entries = await anyio.to_thread.run_sync(_subdirs, workouts_dir)
+        user_ids = [entry.name for entry in user_entries]
+
+    # One summary index read per user instead of one file per workout
+    try:
+        per_user = await _map_in_threads(repo.list_summaries, user_ids)
+    except ValueError as e:  # user_id that isn't a plain directory name
+        raise HTTPException(status_code=400, detail=str(e))
+    all_workouts = list(chain.from_iterable(per_user))
     
     # Sort by date (newest first)
-    all_workouts.sort(key=lambda w: w["workout_date"], reverse=True)
+    all_workouts.sort(key=itemgetter("workout_date"), reverse=True)
     
-    return all_workouts
+    # summaries are plain JSON data already, so encode them straight to the response
+    return StreamingResponse(_iter_json_array(all_workouts), media_type="application/json")
 
 @app.get("/workouts/{user_id}/{workout_date}")
 def get_workout(user_id: str, workout_date: str):
     """Retriieve a workout by user ID and date (YYYY-MM-DD)"""
-    from datetime import datetime
-
     # parse date string to date object
-    date_obj = datetime.strptime(workout_date, "%Y-%m-%d").date()
+    try:
+        date_obj = date_type.fromisoformat(workout_date)
+    except ValueError:
+        raise HTTPException(
+            status_code=400, detail=f"Invalid date '{workout_date}', expected YYYY-MM-DD"
+        )
 
     # get workout from repository
-    workout = repo.get_by_date(user_id, date_obj)
+    try:
+        workout = repo.get_by_date(user_id, date_obj)
+    except ValueError as e:  # user_id that isn't a plain directory name
+        raise HTTPException(status_code=400, detail=str(e))
     
     if not workout:
         return {
@@ -142,28 +186,51 @@ def get_exercises(
         primary_muscle: Filter by muscle (e.g., 'chest', 'biceps')
         level: Filter by difficulty (e.g., 'beginner', 'intermediate')"""
     
-    exercises_file = Path("shared/data/exercises.json")
-    
-    # load JSON
-    with open(exercises_file, "r") as f:
-        exercises_data = json.load(f)
-
+    selected = []
     if equipment:
-        exercises_data = [ex for ex in exercises_data if ex.get('equipment') == equipment]
+        selected.append(_IDX_EQUIPMENT.get(equipment, set()))
     if primary_muscle:
-        exercises_data = [ex for ex in exercises_data if primary_muscle in ex.get('primaryMuscles', [])]
+        selected.append(_IDX_MUSCLE.get(primary_muscle, set()))
     if level:
-        exercises_data = [ex for ex in exercises_data if ex.get('level') == level]
-    
-    return exercises_data
+        selected.append(_IDX_LEVEL.get(level, set()))
+
+    if not selected:
+        return list(_EXERCISES)
+
+    # positions matching every filter, returned in catalogue order
+    positions = set.intersection(*selected)
+    return [_EXERCISES[i] for i in sorted(positions)]
 
 
+def _iter_workout_files_newest_first(user_workout_dir: Path) -> Iterator[str]:
+    """Yield a user's workout files newest first, listing each directory only when reached"""
+    # year, zero-padded month and zero-padded day names sort chronologically as plain strings
+    for year in sorted((entry.name for entry in _subdirs(user_workout_dir)), reverse=True):
+        year_dir = os.path.join(user_workout_dir, year)
+        for month in sorted((entry.name for entry in _subdirs(year_dir)), reverse=True):
+            month_dir = os.path.join(year_dir, month)
+            for day in sorted((entry.name for entry in _json_files(month_dir)), reverse=True):
+                yield os.path.join(month_dir, day)
+
+def _next_page(workout_files: Iterator[str]) -> list[str]:
+    """Take the next LAST_EXERCISE_PAGE_SIZE paths from a workout file iterator"""
+    return list(islice(workout_files, LAST_EXERCISE_PAGE_SIZE))
+
 @app.get("/exercises/{user_id}/{exercise_name}/last")
-def get_last_exercise_performance(user_id: str, exercise_name: str):
+async def get_last_exercise_performance(user_id: str, exercise_name: str):
     """Retrieve the last performance of a specific exercise for a user"""
     
+    # the repository records when each exercise was last saved; check that workout first
+    # (this also rejects a user_id that isn't a plain directory name before it's used below)
+    try:
+        last_date = await anyio.to_thread.run_sync(
+            repo.get_last_exercise_date, user_id, exercise_name
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
     # get user's workout directory
-    user_workout_dir = Path(f"local_storage/workouts/{user_id}")
+    user_workout_dir = repo.workouts_dir / user_id
 
     # check if directory exists
     if not user_workout_dir.exists():
@@ -172,22 +239,27 @@ def get_last_exercise_performance(user_id: str, exercise_name: str):
             "found": False
         }
 
-    # gather all workout files, sorted newest first
-    workout_files = []
-    for year_dir in sorted(user_workout_dir.iterdir(), reverse=True):
-        if not year_dir.is_dir():
-            continue
-        for month_dir in sorted(year_dir.iterdir(), reverse=True):
-            if not month_dir.is_dir():
-                continue
-            for day_file in sorted(month_dir.glob("*.json"), reverse=True):
-                    workout_files.append(day_file)
-    
-    # search for the exercise in the workouts
-    for workout_file in workout_files:
-        with open(workout_file, "r") as f:
-            workout_data = json.load(f)
-            
+    if last_date is None:
+        # the index covers every saved workout, so the exercise was never performed
+        return {"found": False, "message": f"No history found for '{exercise_name}'"}
+
+    workout = await anyio.to_thread.run_sync(repo.get_by_date, user_id, last_date)
+    for exercise in workout.exercises if workout else []:
+        if exercise.name == exercise_name:
+            return {
+                "found": True,
+                "workout_date": workout.workout_date,
+                "exercise": exercise
+            }
+
+    # no longer in that workout (the file changed outside the repository):
+    # search all workout files, newest first
+    workout_files = _iter_workout_files_newest_first(user_workout_dir)
+
+    # search for the exercise in the workouts, one page of concurrent reads at a time;
+    # directories are only listed as the search reaches them
+    while page := await anyio.to_thread.run_sync(_next_page, workout_files):
+        for workout_data in await _load_workout_files(page):
             # look for this exercise in the workout
             for exercise in workout_data.get("exercises", []):
                 if exercise['name'] == exercise_name:
@@ -1,12 +1,86 @@
 """Local filesystem implementation of WorkoutRepository"""
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+import os
 from pathlib import Path
+import threading
 from datetime import date
+from operator import itemgetter
 from typing import List, Optional
-import json
+import orjson
+from pydantic import TypeAdapter
 
-from shared.schemas import WorkoutLog
+from shared.schemas import Exercise, WorkoutLog
 from repositories.workout_repository import WorkoutRepository
 
+try:
+    import fcntl
+except ImportError:  # Windows: index writes are only serialized between threads
+    fcntl = None
+
+# Parses and validates a batch of workout files in a single pydantic-core call
+_WORKOUT_LIST_ADAPTER = TypeAdapter(list[WorkoutLog])
+
+# Most parsed workouts kept in memory per repository
+WORKOUT_CACHE_SIZE = 1024
+# Threads used to read workout files concurrently
+IO_POOL_SIZE = 16
+
+# Per-user file holding one summary line per saved workout
+SUMMARY_INDEX_FILE = "index.jsonl"
+# Per-user file mapping exercise name -> date it was last saved in a workout
+LAST_EXERCISE_INDEX_FILE = "last_exercise.json"
+# Per-user lock file held while either index file is written
+INDEX_LOCK_FILE = "index.lock"
+
+def _read_file(path: str) -> bytes:
+    """Read a whole file as bytes"""
+    with open(path, "rb") as f:
+        return f.read()
+
+def _replace_file(path: str, data: bytes) -> None:
+    """Write data to a temp file next to path, then atomically move it into place"""
+    # unique per process and thread, so concurrent writers never share a temp file
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    # payloads are small and written whole, so skip the buffered file object
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o666)
+    try:
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]
+    finally:
+        os.close(fd)
+    os.replace(tmp_path, path)
+
+def _check_user_id(user_id: str) -> str:
+    """Return user_id if it names a single directory under workouts/, else raise ValueError"""
+    # user ids come straight from requests, so none may point outside the user's directory
+    if (user_id in ("", ".", "..") or os.sep in user_id
+            or (os.altsep and os.altsep in user_id) or os.path.splitdrive(user_id)[0]):
+        raise ValueError(f"Invalid user_id {user_id!r}")
+    return user_id
+
+def _summarize_exercise(exercise: Exercise) -> dict:
+    """Summary info for one exercise, from its per-set reps/weight columns"""
+    return {
+        "name": exercise.name,
+        "num_sets": len(exercise.sets),
+        "max_weight": max(exercise.weights_array),
+        "total_reps": sum(exercise.reps_array)
+    }
+
+def _build_summary(workout: WorkoutLog) -> dict:
+    """Summary info for a workout, as served by workout listings"""
+    return {
+        "workout_date": workout.workout_date.isoformat(),
+        "user_id": workout.user_id,
+        "num_exercises": len(workout.exercises),
+        "total_volume": workout.total_volume,
+        "exercises": [_summarize_exercise(ex) for ex in workout.exercises]
+    }
+
 class LocalWorkoutRepository(WorkoutRepository):
     """
     Stores workouts as JSON files on local filesystem.
@@ -20,6 +94,14 @@ class LocalWorkoutRepository(WorkoutRepository):
                         └── {day}.json
     
     Example: local_storage/workouts/nettle/2024/12/05.json
+
+    Each user directory also holds index.jsonl, one summary line per
+    saved workout, so listings don't have to open every workout file,
+    and last_exercise.json, the date each exercise was last saved.
+    Writes to both hold index.lock, so API worker processes can share them.
+
+    A user_id must be a single directory name; any other (a path, "." or
+    "..") raises ValueError before a path is built from it.
     """
     
     def __init__(self, base_dir: str = "local_storage"):
@@ -33,89 +115,419 @@ class LocalWorkoutRepository(WorkoutRepository):
         self.workouts_dir = self.base_dir / "workouts"
         # Create base directory if it doesn't exist
         self.workouts_dir.mkdir(parents=True, exist_ok=True)
+        # Paths below are built as plain strings; Path objects stay at the public attributes
+        self._workouts_dir_str = str(self.workouts_dir)
+        # Sorted workout dates per user, with the user directory mtime they were read at
+        self._date_index: dict[str, tuple[int, list[date]]] = {}
+        # Guards the date index, whose lists are updated in place after writes
+        self._date_index_lock = threading.Lock()
+        # Per-user locks serializing every write (append, rebuild, read-modify-write) of a
+        # user's index files between this process's threads; _lock_index adds the lock
+        # between processes. Per user, so one user's index rebuild doesn't stall other saves
+        self._index_locks: dict[str, threading.Lock] = {}
+        self._index_locks_lock = threading.Lock()
+        # Parsed workouts by file path, with the file mtime they were read at (LRU order)
+        self._workout_cache: OrderedDict[str, tuple[int, WorkoutLog]] = OrderedDict()
+        self._workout_cache_lock = threading.Lock()
+        # Shared by get_date_range so each call doesn't start its own threads
+        self._io_pool = ThreadPoolExecutor(max_workers=IO_POOL_SIZE)
+
+    def _get_user_dir(self, user_id: str) -> str:
+        """Construct the directory path holding a user's workouts; all user paths build on it"""
+        return os.path.join(self._workouts_dir_str, _check_user_id(user_id))
 
-    def _get_workout_path(self, user_id: str, workout_date: date) -> Path:
+    def _get_workout_path(self, user_id: str, workout_date: date) -> str:
         """Construct the file path for a given user's workout on a specific date"""
-        return (self.workouts_dir / user_id / 
-                str(workout_date.year) / 
-                f"{workout_date.month:02d}" / 
-                f"{workout_date.day:02d}.json")
+        return os.path.join(self._get_user_dir(user_id),
+                            str(workout_date.year),
+                            f"{workout_date.month:02d}",
+                            f"{workout_date.day:02d}.json")
+
+    def _get_summary_index_path(self, user_id: str) -> str:
+        """Construct the path of a user's workout summary index"""
+        return os.path.join(self._get_user_dir(user_id), SUMMARY_INDEX_FILE)
+
+    def _get_last_exercise_index_path(self, user_id: str) -> str:
+        """Construct the path of a user's last-exercise index"""
+        return os.path.join(self._get_user_dir(user_id), LAST_EXERCISE_INDEX_FILE)
+
+    @contextmanager
+    def _lock_index(self, user_id: str):
+        """Hold a user's index files exclusively, across threads and processes (API workers)"""
+        lock_path = os.path.join(self._get_user_dir(user_id), INDEX_LOCK_FILE)
+        with self._index_locks_lock:
+            user_lock = self._index_locks.get(user_id)
+            if user_lock is None:
+                user_lock = self._index_locks[user_id] = threading.Lock()
+
+        with user_lock:
+            if fcntl is None:
+                yield
+                return
+            fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o666)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+                yield
+            finally:
+                os.close(fd)  # closing the file releases the lock
 
     def save(self, workout: WorkoutLog) -> str:
         """Save a workout to local filesystem."""
         file_path = self._get_workout_path(workout.user_id, workout.workout_date)
         # Create directory if it doesn't exist
-        file_path.parent.mkdir(parents=True, exist_ok=True)
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
         # Serialize workout to JSON
-        workout_json = workout.model_dump_json(indent=2)
-        # Write to file
-        file_path.write_text(workout_json)
-        return str(file_path)
+        workout_json = workout.model_dump_json().encode()
+        # Write to file (readers never see a partially written workout)
+        _replace_file(file_path, workout_json)
+        self._evict_workout(file_path)
+        with self._lock_index(workout.user_id):
+            # the index writes below change the user directory mtime as well, so read it first
+            mtime = os.stat(self._get_user_dir(workout.user_id)).st_mtime_ns
+            self._append_summary(workout)
+            self._record_last_exercises(workout)
+            self._update_date_index(workout.user_id, workout.workout_date, mtime, present=True)
+        return file_path
+
+    def _get_cached_workout(self, file_path: str) -> tuple[Optional[int], Optional[WorkoutLog]]:
+        """
+        Look up a workout file in the cache.
+
+        Returns:
+            (mtime_ns, workout): mtime_ns is None if the file doesn't exist,
+            workout is None unless cached for the file's current mtime
+        """
+        try:
+            mtime = os.stat(file_path).st_mtime_ns
+        except FileNotFoundError:
+            return None, None
+
+        with self._workout_cache_lock:
+            cached = self._workout_cache.get(file_path)
+            if cached is None or cached[0] != mtime:
+                return mtime, None
+            self._workout_cache.move_to_end(file_path)
+            return mtime, cached[1]
+
+    def _cache_workout(self, file_path: str, mtime: int, workout: WorkoutLog) -> None:
+        """Cache a parsed workout file, evicting the least recently used entries"""
+        with self._workout_cache_lock:
+            self._workout_cache[file_path] = (mtime, workout)
+            self._workout_cache.move_to_end(file_path)
+            while len(self._workout_cache) > WORKOUT_CACHE_SIZE:
+                self._workout_cache.popitem(last=False)
+
+    def _evict_workout(self, file_path: str) -> None:
+        """Drop a workout file from the cache after writing or deleting it"""
+        with self._workout_cache_lock:
+            self._workout_cache.pop(file_path, None)
 
     def get_by_date(self, user_id: str, workout_date: date) -> Optional[WorkoutLog]:
         """Retrieve a workout for a specific user and date."""
         file_path = self._get_workout_path(user_id, workout_date)
-        if not file_path.exists():
-            return None
-
-        # Read JSON file
-        workout_json = file_path.read_text()
-        # Deserialize to WorkoutLog
-        workout = WorkoutLog.model_validate_json(workout_json)
+        mtime, workout = self._get_cached_workout(file_path)
+        if mtime is not None and workout is None:
+            # Read JSON file and deserialize to WorkoutLog
+            workout = WorkoutLog.model_validate_json(_read_file(file_path))
+            self._cache_workout(file_path, mtime, workout)
         return workout
 
     def get_date_range(self, user_id: str, start_date: date, end_date: date) -> List[WorkoutLog]:
         """Retrieve all workouts for a user in a date range."""
         workouts = []
+        uncached = []  # (position in workouts, file path, mtime, raw JSON)
         
-        # Get all workout dates for user
+        # Get all workout dates for user (sorted, so the range is a slice)
         all_dates = self.list_dates(user_id)
+        first = bisect_left(all_dates, start_date)
+        last = bisect_right(all_dates, end_date)
+
+        # Stat, check the cache and read the files concurrently; results keep date order
+        file_paths = [self._get_workout_path(user_id, d) for d in all_dates[first:last]]
+        reads = self._io_pool.map(self._read_for_range, file_paths)
 
-        for workout_date in all_dates:
-            if start_date <= workout_date <= end_date:
-                workout = self.get_by_date(user_id, workout_date)
-                if workout:
-                    workouts.append(workout)
+        for file_path, mtime, workout, workout_json in reads:
+            if mtime is None:
+                continue
+            if workout_json is not None:
+                uncached.append((len(workouts), file_path, mtime, workout_json))
+            workouts.append(workout)
         
-        # Sort workouts by date
-        workouts.sort(key=lambda w: w.workout_date)
+        # Parse and validate the uncached workouts as one JSON array, already in date order
+        parsed = _WORKOUT_LIST_ADAPTER.validate_json(
+            b"[" + b",".join(raw for *_, raw in uncached) + b"]"
+        )
+        for (position, file_path, mtime, _), workout in zip(uncached, parsed):
+            workouts[position] = workout
+            self._cache_workout(file_path, mtime, workout)
         return workouts
 
+    def _read_for_range(self, file_path: str) -> tuple:
+        """(file path, mtime_ns, cached workout, raw JSON if the file must be parsed)"""
+        mtime, workout = self._get_cached_workout(file_path)
+        if mtime is None or workout is not None:
+            return file_path, mtime, workout, None
+        return file_path, mtime, workout, _read_file(file_path)
+
     def delete(self, user_id: str, workout_date: date) -> bool:
         """Delete a workout for a specific user and date."""
         file_path = self._get_workout_path(user_id, workout_date)
         
-        if not file_path.exists():
+        try:
+            os.unlink(file_path)  # Delete the file
+        except FileNotFoundError:
             return False
         
-        file_path.unlink()  # Delete the file
+        self._evict_workout(file_path)
+        with self._lock_index(user_id):
+            mtime = os.stat(self._get_user_dir(user_id)).st_mtime_ns
+            # an unreadable index is left for list_summaries to rebuild without this workout
+            summaries = self._read_summary_index(user_id)
+            if summaries is not None:
+                summaries.pop(workout_date.isoformat(), None)
+                self._write_summary_index(user_id, summaries.values())
+            self._forget_last_exercises(user_id, workout_date)
+            self._update_date_index(user_id, workout_date, mtime, present=False)
         return True
 
+    def list_summaries(self, user_id: str) -> List[dict]:
+        """
+        Get summary info for all of a user's workouts.
+
+        Summaries are read from the user's index file, which is rebuilt
+        from the workout files if it doesn't exist yet or can't be decoded.
+
+        Args:
+            user_id: User identifier
+
+        Returns:
+            List of workout summaries, sorted chronologically
+        """
+        summaries = self._read_summary_index(user_id)
+        if summaries is None:
+            try:
+                with self._lock_index(user_id):
+                    # another writer may have rebuilt it while this one waited
+                    summaries = self._read_summary_index(user_id)
+                    if summaries is None:
+                        summaries = self._rebuild_summary_index(user_id)
+            except FileNotFoundError:
+                return []  # no user directory, so no workouts
+
+        return sorted(summaries.values(), key=itemgetter("workout_date"))
+
+    def _read_summary_index(self, user_id: str) -> Optional[dict[str, dict]]:
+        """Read a user's summary index keyed by workout date, None if it's missing or unreadable"""
+        try:
+            lines = _read_file(self._get_summary_index_path(user_id)).splitlines()
+        except FileNotFoundError:
+            return None
+        try:
+            # later lines win, so a re-saved workout replaces its earlier summary
+            return {summary["workout_date"]: summary for summary in map(orjson.loads, lines)}
+        except orjson.JSONDecodeError:
+            return None  # e.g. a torn line from an interrupted append
+
+    def _append_summary(self, workout: WorkoutLog) -> None:
+        """Add a saved workout's summary to its user's index (call with the index locked)"""
+        try:
+            # no O_CREAT: only an index that already covers every workout file is appended to
+            fd = os.open(self._get_summary_index_path(workout.user_id), os.O_WRONLY | os.O_APPEND)
+        except FileNotFoundError:
+            # workouts saved before the index existed; the scan includes the one just written
+            self._rebuild_summary_index(workout.user_id)
+            return
+        # a re-saved date appends a newer line that replaces the old one
+        with open(fd, "ab") as f:
+            f.write(orjson.dumps(_build_summary(workout)) + b"\n")
+
+    def _rebuild_summary_index(self, user_id: str) -> dict[str, dict]:
+        """Rebuild a user's summary index from their workout files (call with the index locked)"""
+        summaries = {}
+        for workout_date in self._scan_dates(self._get_user_dir(user_id)):
+            workout = self.get_by_date(user_id, workout_date)
+            if workout is not None:  # deleted since the scan
+                summaries[workout_date.isoformat()] = _build_summary(workout)
+        self._write_summary_index(user_id, summaries.values())
+        return summaries
+
+    def _write_summary_index(self, user_id: str, summaries) -> None:
+        """Replace a user's summary index with the given summaries"""
+        data = b"".join(orjson.dumps(s) + b"\n" for s in summaries)
+        _replace_file(self._get_summary_index_path(user_id), data)
+
+    def get_last_exercise_date(self, user_id: str, exercise_name: str) -> Optional[date]:
+        """
+        Get the date an exercise was last saved for a user.
+
+        The index is seeded from all of the user's workout files when it's
+        first created, so None means the exercise was never performed.
+
+        Args:
+            user_id: User identifier
+            exercise_name: Exact exercise name
+
+        Returns:
+            Date of the newest saved workout containing the exercise, or None
+        """
+        last_dates = self._read_last_exercise_index(user_id)
+        if last_dates is None:
+            try:
+                with self._lock_index(user_id):
+                    last_dates = self._load_last_exercise_index(user_id)
+            except FileNotFoundError:
+                return None  # no user directory, so no workouts
+        last_date = last_dates.get(exercise_name)
+        return date.fromisoformat(last_date) if last_date else None
+
+    def _read_last_exercise_index(self, user_id: str) -> Optional[dict[str, str]]:
+        """Read a user's exercise name -> ISO date map, None if there isn't one"""
+        try:
+            return orjson.loads(_read_file(self._get_last_exercise_index_path(user_id)))
+        except FileNotFoundError:
+            return None
+
+    def _load_last_exercise_index(self, user_id: str) -> dict[str, str]:
+        """Read a user's last-exercise index, seeding it if missing (call with the index locked)"""
+        last_dates = self._read_last_exercise_index(user_id)
+        if last_dates is None:
+            # workouts saved before the index existed; the scan includes any just written
+            last_dates = self._find_last_dates(user_id)
+            _replace_file(self._get_last_exercise_index_path(user_id), orjson.dumps(last_dates))
+        return last_dates
+
+    def _find_last_dates(self, user_id: str, names: Optional[set[str]] = None) -> dict[str, str]:
+        """
+        Scan a user's workout files newest first for the date each exercise was last performed.
+
+        Args:
+            user_id: User identifier
+            names: Only look for these exercises, stopping once all are found
+
+        Returns:
+            Exercise name -> ISO date of the newest workout containing it
+        """
+        last_dates = {}
+        for workout_date in reversed(self._scan_dates(self._get_user_dir(user_id))):
+            workout = self.get_by_date(user_id, workout_date)
+            if workout is None:  # deleted since the scan
+                continue
+            for ex in workout.exercises:
+                if names is None or ex.name in names:
+                    last_dates.setdefault(ex.name, workout_date.isoformat())
+            if names is not None and len(last_dates) == len(names):
+                break
+        return last_dates
+
+    def _record_last_exercises(self, workout: WorkoutLog) -> None:
+        """Point each of the workout's exercises at its date (call with the index locked)"""
+        workout_date = workout.workout_date.isoformat()
+        last_dates = self._load_last_exercise_index(workout.user_id)
+        for ex in workout.exercises:
+            if last_dates.get(ex.name, "") <= workout_date:
+                last_dates[ex.name] = workout_date
+        index_path = self._get_last_exercise_index_path(workout.user_id)
+        _replace_file(index_path, orjson.dumps(last_dates))
+
+    def _forget_last_exercises(self, user_id: str, workout_date: date) -> None:
+        """Repoint exercises at a deleted workout's date to their newest remaining one
+
+        Call with the index locked.
+        """
+        deleted_date = workout_date.isoformat()
+        last_dates = self._load_last_exercise_index(user_id)
+        dropped = {name for name, d in last_dates.items() if d == deleted_date}
+        if dropped:
+            for name in dropped:
+                del last_dates[name]
+            last_dates.update(self._find_last_dates(user_id, dropped))
+            index_path = self._get_last_exercise_index_path(user_id)
+            _replace_file(index_path, orjson.dumps(last_dates))
+
     def list_dates(self, user_id: str) -> List[date]:
         """Get all dates that have workouts for a user."""
         # get user directory
-        user_dir = self.workouts_dir / user_id
-        
-        if not user_dir.exists():
-            return []
+        user_dir = self._get_user_dir(user_id)
         
+        # reuse the cached dates unless the user directory changed since they were read;
+        # stat and scan under the lock so a concurrent save's update can't be overwritten
+        with self._date_index_lock:
+            try:
+                mtime = os.stat(user_dir).st_mtime_ns
+            except FileNotFoundError:
+                self._date_index.pop(user_id, None)
+                return []
+            cached = self._date_index.get(user_id)
+            if cached is None or cached[0] != mtime:
+                cached = (mtime, self._scan_dates(user_dir))
+                self._date_index[user_id] = cached
+            return list(cached[1])
+
+    def _update_date_index(self, user_id: str, workout_date: date, mtime: int,
+                           present: bool) -> None:
+        """
+        Add or remove a date in a user's cached date index after a write.
+
+        Call with the index locked, passing the user directory mtime read
+        when the lock was taken.
+        """
+        # a new day inside an existing month doesn't change the user directory mtime on its
+        # own; bump it so date indexes held by other processes (API workers) see the write
+        user_dir = self._get_user_dir(user_id)
+        os.utime(user_dir)
+
+        with self._date_index_lock:
+            cached = self._date_index.get(user_id)
+            if cached is None:
+                return  # not loaded yet, list_dates will scan it
+            if cached[0] != mtime:
+                # the directory changed since the dates were read (another process's write,
+                # or a new year directory): this write alone can't bring them up to date
+                del self._date_index[user_id]
+                return
+
+            dates = cached[1]
+            i = bisect_left(dates, workout_date)
+            found = i < len(dates) and dates[i] == workout_date
+            if present and not found:
+                dates.insert(i, workout_date)
+            elif not present and found:
+                del dates[i]
+
+            mtime = os.stat(user_dir).st_mtime_ns
+            self._date_index[user_id] = (mtime, dates)
+
+    def _scan_dates(self, user_dir: str) -> List[date]:
+        """Walk a user's year/month/day directories and collect workout dates.
+
+        Only the names are read; entries that aren't YYYY/MM/DD.json (index
+        files, leftover temp files, anything else) are skipped.
+        """
         dates = []
 
-        for year_dir in user_dir.iterdir():
-            if not year_dir.is_dir():
-                continue
-            
-            for month_dir in year_dir.iterdir():
-                if not month_dir.is_dir():
+        with os.scandir(user_dir) as year_entries:
+            for year_entry in year_entries:
+                if not (year_entry.name.isdigit() and year_entry.is_dir()):
                     continue
-                
-                for day_file in month_dir.glob("*.json"):
-                    # Parse date from directory structure
-                    year = int(year_dir.name)
-                    month = int(month_dir.name)
-                    day = int(day_file.stem)  # filename without .json
-                    
-                    dates.append(date(year, month, day))
+                year = int(year_entry.name)
+
+                with os.scandir(year_entry.path) as month_entries:
+                    for month_entry in month_entries:
+                        if not (month_entry.name.isdigit() and month_entry.is_dir()):
+                            continue
+                        month = int(month_entry.name)
+
+                        with os.scandir(month_entry.path) as day_entries:
+                            for day_entry in day_entries:
+                                day = day_entry.name[:-5]  # filename without .json
+                                if not (day_entry.name.endswith(".json") and day.isdigit()
+                                        and day_entry.is_file(follow_symlinks=False)):
+                                    continue
+                                # Parse date from directory structure
+                                try:
+                                    dates.append(date(year, month, int(day)))
+                                except ValueError:
+                                    continue  # not a calendar date
         
         # Sort dates chronologically
         dates.sort()
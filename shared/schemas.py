@@ -1,7 +1,8 @@
 # pydantic models for workout tracking application
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field, computed_field
 from datetime import date
-from typing import Optional
+from functools import cache, cached_property
+from typing import Any, Optional, Self
 from enum import Enum
 
 class EquipmentType(str, Enum):
@@ -23,6 +24,10 @@ class Set(BaseModel):
     weight_lbs: float = Field(ge=0, description="Weight used (per hand for dumbbells/kettlebells)")
     goal_reps: int | None = Field(None, gt=0, description="Planned reps")
     goal_weight_lbs: float | None = Field(None, ge=0, description="Planned weight")
+
+    # immutable once logged; volumes are one multiply, so they aren't memoized:
+    # caching them would grow every set's __dict__ by half
+    model_config = ConfigDict(frozen=True)
     
     @property
     def volume(self) -> float:
@@ -36,60 +41,110 @@ class Set(BaseModel):
         goal_w = self.goal_weight_lbs or self.weight_lbs
         return goal_r * goal_w
 
-class Exercise(BaseModel):
+@cache
+def _cached_property_names(cls: type) -> tuple[str, ...]:
+    """Names of the cached_property attributes defined on cls and its bases"""
+    return tuple(name for klass in cls.__mro__ for name, attr in vars(klass).items()
+                 if isinstance(attr, cached_property))
+
+class _MemoizedModel(BaseModel):
+    """Model whose derived values are memoized with cached_property"""
+
+    # frozen blocks field assignment, so an instance's memoized values stay valid;
+    # a changed model is made with model_copy(update=...), which clears them (below)
+    model_config = ConfigDict(frozen=True, ignored_types=(cached_property,))
+
+    def model_copy(self, *, update: dict[str, Any] | None = None, deep: bool = False) -> Self:
+        """Copy the model; with update, values memoized from the old fields are dropped"""
+        copied = super().model_copy(update=update, deep=deep)
+        if update:
+            # memoized values live in __dict__, which the copy starts from
+            for name in _cached_property_names(type(self)):
+                copied.__dict__.pop(name, None)
+        return copied
+
+class Exercise(_MemoizedModel):
     """Exercise with multiple sets, allowing variable reps/weight per set"""
     name: str = Field(min_length=1, max_length=100, description="Exercise name, e.g., 'Bench Press'")
-    sets: list[Set] = Field(min_length=1, description="Sets performed")
+    sets: tuple[Set, ...] = Field(min_length=1, description="Sets performed")
     equipment: EquipmentType = Field(description="Equipment type")
     notes: str | None = Field(None, max_length=500, description="Exercise-specific notes")
+
+    @cached_property
+    def reps_array(self) -> list[int]:
+        """Reps of each set, parallel to weights_array"""
+        return [s.reps for s in self.sets]
+
+    @cached_property
+    def weights_array(self) -> list[float]:
+        """Weight of each set, parallel to reps_array"""
+        return [s.weight_lbs for s in self.sets]
     
-    @property
+    @cached_property
     def total_volume(self) -> float:
         """Total volume: sum of all set volumes"""
-        return sum(s.volume for s in self.sets)
+        return sum([s.reps * s.weight_lbs for s in self.sets])
     
-    @property
+    @cached_property
     def goal_volume(self) -> float:
         """Planned volume: sum of all goal volumes"""
-        return sum(s.goal_volume for s in self.sets)
+        return sum([s.goal_volume for s in self.sets])
     
+    @cached_property
+    def has_goal(self) -> bool:
+        """Whether any set has a planned reps or weight"""
+        return any(s.goal_reps is not None or s.goal_weight_lbs is not None for s in self.sets)
+
     @property
     def volume_achievement(self) -> float:
         """Achievement ratio (1.0 = 100% of goal achieved)"""
-        if self.goal_volume == 0:
+        if not self.has_goal:
+            return 1.0  # goal volume falls back to the actual volume
+        goal_volume = self.goal_volume
+        if goal_volume == 0:
             return 1.0
-        return self.total_volume / self.goal_volume
+        return self.total_volume / goal_volume
     
-    @property
+    @cached_property
     def set_count(self) -> int:
         """Number of sets performed"""
         return len(self.sets)
 
-class WorkoutLog(BaseModel):
+class WorkoutLog(_MemoizedModel):
     """Complete workout log for a single day"""
     workout_date: date = Field(description="Date of workout")
     user_id: str = Field(min_length=1, description="User identifier")
-    exercises: list[Exercise] = Field(min_length=1, description="Exercises performed")
+    exercises: tuple[Exercise, ...] = Field(min_length=1, description="Exercises performed")
     notes: str | None = Field(None, max_length=1000, description="Workout notes")
 
+    # not cached: it's serialized with every workout, and only sums the exercise totals
+    @computed_field
     @property
     def total_volume(self) -> float:
-        """Sum of all exercise volumes"""
-        return sum(ex.total_volume for ex in self.exercises)
+        """Sum of all exercise volumes (included when serialized)"""
+        return sum([ex.total_volume for ex in self.exercises])
 
-    @property
+    @cached_property
     def goal_volume(self) -> float:
         """Sum of all exercise goal volumes"""
-        return sum(ex.goal_volume for ex in self.exercises)
+        return sum([ex.goal_volume for ex in self.exercises])
+
+    @cached_property
+    def has_goal(self) -> bool:
+        """Whether any set in the workout has a planned reps or weight"""
+        return any(ex.has_goal for ex in self.exercises)
 
     @property
     def volume_achievement(self) -> float:
         """Overall achievement ratio (1.0 = 100% of goal achieved)"""
-        if self.goal_volume == 0:
+        if not self.has_goal:
+            return 1.0  # goal volume falls back to the actual volume
+        goal_volume = self.goal_volume
+        if goal_volume == 0:
             return 1.0
-        return (self.total_volume / self.goal_volume)
+        return (self.total_volume / goal_volume)
     
-    @property
+    @cached_property
     def exercise_count(self) -> int:
         """How many exercises in this workout"""
         return len(self.exercises)
@@ -0,0 +1,137 @@
+"""Tests for the FastAPI endpoints"""
+
+import os
+
+import orjson
+import pytest
+from fastapi.testclient import TestClient
+
+import api.main
+from repositories.local_workout_repository import LocalWorkoutRepository
+
+
+@pytest.fixture
+def repo(tmp_path, monkeypatch):
+    """Point the API at a repository in a temporary directory"""
+    repo = LocalWorkoutRepository(base_dir=str(tmp_path))
+    monkeypatch.setattr(api.main, "repo", repo)
+    return repo
+
+
+@pytest.fixture
+def client(repo):
+    return TestClient(api.main.app)
+
+
+def make_workout_json(workout_date: str, name: str = "Squat", weight_lbs: float = 100.0,
+                      user_id: str = "test_user") -> dict:
+    """Request body for a one-exercise workout"""
+    return {
+        "workout_date": workout_date,
+        "user_id": user_id,
+        "exercises": [{
+            "name": name,
+            "equipment": "barbell",
+            "sets": [{"reps": 5, "weight_lbs": weight_lbs}]
+        }]
+    }
+
+
+def filter_exercises(equipment=None, primary_muscle=None, level=None) -> list[dict]:
+    """The /exercises filters applied one after another over the whole catalogue"""
+    exercises = orjson.loads(api.main.EXERCISES_FILE.read_bytes())
+    if equipment:
+        exercises = [ex for ex in exercises if ex.get("equipment") == equipment]
+    if primary_muscle:
+        exercises = [ex for ex in exercises if primary_muscle in ex.get("primaryMuscles", [])]
+    if level:
+        exercises = [ex for ex in exercises if ex.get("level") == level]
+    return exercises
+
+
+def test_get_workout_invalid_date(client):
+    response = client.get("/workouts/test_user/2024-13-06")
+    assert response.status_code == 400
+    assert "2024-13-06" in response.json()["detail"]
+
+
+@pytest.mark.parametrize("params", [
+    {},
+    {"equipment": "barbell"},
+    {"primary_muscle": "chest"},
+    {"level": "beginner"},
+    {"equipment": "dumbbell", "primary_muscle": "biceps"},
+    {"equipment": "barbell", "primary_muscle": "chest", "level": "beginner"},
+    {"equipment": "no such equipment"},
+])
+def test_get_exercises_filters(client, params):
+    assert client.get("/exercises", params=params).json() == filter_exercises(**params)
+
+
+def test_get_all_workouts_includes_workouts_saved_before_index(client, repo):
+    """The streamed listing is one JSON array, newest first, including pre-index workouts"""
+    client.post("/workouts", json=make_workout_json("2024-06-02"))
+    client.post("/workouts", json=make_workout_json("2024-06-03", user_id="other_user"))
+    # as if test_user's workout was saved before the summary index was introduced
+    os.remove(repo._get_summary_index_path("test_user"))
+    client.post("/workouts", json=make_workout_json("2024-06-04", weight_lbs=120.0))
+
+    response = client.get("/workouts")
+    workouts = orjson.loads(response.content)
+
+    assert response.headers["content-type"] == "application/json"
+    assert [(w["user_id"], w["workout_date"]) for w in workouts] == [
+        ("test_user", "2024-06-04"),
+        ("other_user", "2024-06-03"),
+        ("test_user", "2024-06-02"),
+    ]
+    assert workouts[0]["total_volume"] == 600.0
+    by_user = client.get("/workouts", params={"user_id": "test_user"}).json()
+    assert [w["workout_date"] for w in by_user] == ["2024-06-04", "2024-06-02"]
+
+
+def test_last_exercise_ignores_backfilled_older_workout(client, repo):
+    """A workout saved before the last-exercise index existed still counts as the newest"""
+    client.post("/workouts", json=make_workout_json("2024-06-02", weight_lbs=210.0))
+    # as if the June workout was saved before the index was introduced
+    os.remove(repo._get_last_exercise_index_path("test_user"))
+
+    client.post("/workouts", json=make_workout_json("2024-01-01", weight_lbs=50.0))
+
+    response = client.get("/exercises/test_user/Squat/last").json()
+    assert response["found"] is True
+    assert response["workout_date"] == "2024-06-02"
+    assert response["exercise"]["sets"][0]["weight_lbs"] == 210.0
+
+
+def test_last_exercise_after_deleting_newest_workout(client, repo):
+    client.post("/workouts", json=make_workout_json("2024-01-01", weight_lbs=50.0))
+    client.post("/workouts", json=make_workout_json("2024-06-02", weight_lbs=210.0))
+    repo.delete("test_user", repo.list_dates("test_user")[-1])
+
+    response = client.get("/exercises/test_user/Squat/last").json()
+    assert response["workout_date"] == "2024-01-01"
+
+    missing = client.get("/exercises/test_user/Deadlift/last").json()
+    assert missing["found"] is False
+
+
+@pytest.mark.parametrize("user_id", ["..", ".", "a/b", "{tmp_dir}"])
+def test_user_id_outside_workouts_dir_rejected(client, repo, tmp_path_factory, user_id):
+    """A user_id that isn't a plain directory name gets a 400 and writes nothing"""
+    outside = tmp_path_factory.mktemp("outside")
+    user_id = user_id.format(tmp_dir=outside)
+    before = sorted(repo.base_dir.rglob("*"))
+
+    responses = [
+        client.get("/workouts", params={"user_id": user_id}),
+        client.post("/workouts", json=make_workout_json("2024-06-02", user_id=user_id)),
+    ]
+    if "/" not in user_id:
+        # dot segments sent encoded, so the client doesn't collapse them
+        encoded = user_id.replace(".", "%2E")
+        responses.append(client.get(f"/exercises/{encoded}/Squat/last"))
+
+    assert [r.status_code for r in responses] == [400] * len(responses)
+    assert sorted(repo.base_dir.rglob("*")) == before
+    assert list(outside.iterdir()) == []
@@ -1,45 +1,49 @@
 """Tests for LocalWorkoutRepository"""
+from repositories import local_workout_repository
 from repositories.local_workout_repository import LocalWorkoutRepository
 from shared.schemas import WorkoutLog, Exercise, Set, EquipmentType
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import get_context
 from datetime import date
+import sys
 
+import orjson
 import pytest
-import shutil
 from pathlib import Path
 
 @pytest.fixture
-def temp_repo():
-    """Fixture to create and clean up a temporary LocalWorkoutRepository"""
-    # Setup - create repo with unique temp directory
-    temp_dir = Path("test_data_temp")
-    repo = LocalWorkoutRepository(base_dir=str(temp_dir))
-    # run the test
-    yield repo
-    # cleanup after test
-    if temp_dir.exists():
-        shutil.rmtree(temp_dir)
-
-def test_repository_initialization(temp_repo):
+def temp_repo(tmp_path):
+    """Fixture to create a LocalWorkoutRepository in a per-test temporary directory"""
+    # pytest removes tmp_path itself, and each test (or xdist worker) gets its own
+    return LocalWorkoutRepository(base_dir=str(tmp_path))
+
+def make_workout(workout_date, name="Test", equipment=EquipmentType.DUMBBELL, sets=None,
+                 user_id="test_user"):
+    """Build a single-exercise workout (one 10 x 10 lbs set unless sets are given)"""
+    return WorkoutLog(
+        workout_date=workout_date,
+        user_id=user_id,
+        exercises=[
+            Exercise(
+                name=name,
+                equipment=equipment,
+                sets=sets or [Set(reps=10, weight_lbs=10)]
+            )
+        ]
+    )
+
+def test_repository_initialization(temp_repo, tmp_path):
     """Test initialization of LocalWorkoutRepository"""
     
-    assert temp_repo.base_dir.name == "test_data_temp"
+    assert temp_repo.base_dir == tmp_path
     assert temp_repo.workouts_dir.exists()
 
 def test_save_and_retrieve_workout(temp_repo):
     """Test saving and retrieving a workout log"""
 
     # arrange
-    workout = WorkoutLog(
-        workout_date=date(2024, 12, 10),
-        user_id="test_user",
-        exercises=[
-            Exercise(
-                name="Bench Press",
-                equipment=EquipmentType.BARBELL,
-                sets=[Set(reps=10, weight_lbs=20)]
-            )
-        ]
-    )
+    workout = make_workout(date(2024, 12, 10), "Bench Press", EquipmentType.BARBELL,
+                           [Set(reps=10, weight_lbs=20)])
     
     # act
     file_path = temp_repo.save(workout)
@@ -57,17 +61,8 @@ def test_save_and_retrieve_workout(temp_repo):
 def test_delete_workout(temp_repo):
     """Test deleting a workout."""
     # arrange
-    workout = WorkoutLog(
-        workout_date=date(2024, 12, 11),
-        user_id="test_user",
-        exercises=[
-            Exercise(
-                name="Squat",
-                equipment=EquipmentType.BARBELL,
-                sets=[Set(reps=5, weight_lbs=185)]
-            )
-        ]
-    )
+    workout = make_workout(date(2024, 12, 11), "Squat", EquipmentType.BARBELL,
+                           [Set(reps=5, weight_lbs=185)])
     
     # act
     temp_repo.save(workout)
@@ -89,24 +84,14 @@ def test_delete_nonexistent_workout(temp_repo):
     # assert
     assert deleted is False  # Didn't exist, so returns False
 
-def test_list_dates(temp_repo):
+@pytest.mark.parametrize("days", [[15, 16, 17], [17, 15, 16]])
+def test_list_dates(temp_repo, days):
     """Test listing all workout dates for a user."""
     # Arrange in temp_repo
     
-    # Create 3 workouts on different dates
-    for day in [15, 16, 17]:
-        workout = WorkoutLog(
-            workout_date=date(2024, 12, day),
-            user_id="test_user",
-            exercises=[
-                Exercise(
-                    name="Test",
-                    equipment=EquipmentType.DUMBBELL,
-                    sets=[Set(reps=10, weight_lbs=10)]
-                )
-            ]
-        )
-        temp_repo.save(workout)
+    # Create 3 workouts on different dates, in the given save order
+    for day in days:
+        temp_repo.save(make_workout(date(2024, 12, day)))
     
     # Act
     dates = temp_repo.list_dates("test_user")
@@ -116,34 +101,327 @@ def test_list_dates(temp_repo):
     assert date(2024, 12, 15) in dates
     assert date(2024, 12, 16) in dates
     assert date(2024, 12, 17) in dates
+    assert dates == sorted(dates)
 
-def test_get_date_range(temp_repo):
+@pytest.mark.parametrize("start_day, end_day, expected_days", [
+    (21, 22, [21, 22]),
+    (20, 20, [20]),
+    (19, 23, [20, 21, 22]),
+    (23, 31, []),
+])
+def test_get_date_range(temp_repo, start_day, end_day, expected_days):
     """Test retrieving workouts in a date range."""
     # Arrange in temp_repo
     
     # Create workouts on different dates
     for day in [20, 21, 22]:
-        workout = WorkoutLog(
-            workout_date=date(2024, 12, day),
+        temp_repo.save(make_workout(date(2024, 12, day), f"Day {day} Exercise",
+                                    EquipmentType.BARBELL, [Set(reps=8, weight_lbs=100)]))
+    
+    # Act
+    workouts = temp_repo.get_date_range(
+        "test_user",
+        start_date=date(2024, 12, start_day),
+        end_date=date(2024, 12, end_day)
+    )
+    
+    # Assert
+    assert len(workouts) == len(expected_days)
+    assert [w.workout_date for w in workouts] == [date(2024, 12, d) for d in expected_days]
+    assert [w.exercises[0].name for w in workouts] == [f"Day {d} Exercise" for d in expected_days]
+
+def test_list_dates_tracks_save_and_delete(temp_repo):
+    """Test that cached workout dates stay current after saves and deletes."""
+    # Arrange - load the date index before writing more workouts
+    for day in [1, 2]:
+        temp_repo.save(make_workout(date(2025, 1, day)))
+    assert temp_repo.list_dates("test_user") == [date(2025, 1, 1), date(2025, 1, 2)]
+
+    # Act - new month in the same year, then remove an earlier workout
+    temp_repo.save(make_workout(date(2025, 2, 3)))
+    temp_repo.delete("test_user", date(2025, 1, 1))
+
+    # Assert
+    assert temp_repo.list_dates("test_user") == [date(2025, 1, 2), date(2025, 2, 3)]
+
+def test_list_dates_concurrent_saves(temp_repo):
+    """Test concurrent saves (including repeats of a date) leave one sorted entry per date."""
+    # Arrange - load the date index so saves update it in place
+    temp_repo.save(make_workout(date(2025, 1, 1)))
+    assert temp_repo.list_dates("test_user") == [date(2025, 1, 1)]
+    days = [day for day in range(2, 29) for _ in range(3)]
+
+    # Act
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(lambda day: temp_repo.save(make_workout(date(2025, 1, day))), days))
+
+    # Assert
+    expected = [date(2025, 1, day) for day in range(1, 29)]
+    assert temp_repo.list_dates("test_user") == expected
+    fresh_repo = LocalWorkoutRepository(base_dir=str(temp_repo.base_dir))
+    assert fresh_repo.list_dates("test_user") == expected
+
+def test_list_dates_sees_other_repository_saves(temp_repo):
+    """Test a save doesn't hide another repository's (API worker's) save from the date index."""
+    # Arrange - a second repository on the same directory, as another worker would have
+    other_repo = LocalWorkoutRepository(base_dir=str(temp_repo.base_dir))
+    temp_repo.save(make_workout(date(2025, 1, 1)))
+    assert temp_repo.list_dates("test_user") == [date(2025, 1, 1)]
+
+    # Act
+    other_repo.save(make_workout(date(2025, 1, 2)))
+    temp_repo.save(make_workout(date(2025, 1, 3)))
+
+    # Assert
+    expected = [date(2025, 1, 1), date(2025, 1, 2), date(2025, 1, 3)]
+    assert temp_repo.list_dates("test_user") == expected
+    workouts = temp_repo.get_date_range("test_user", date(2025, 1, 1), date(2025, 1, 31))
+    assert [w.workout_date for w in workouts] == expected
+
+def test_list_dates_skips_stray_entries(temp_repo):
+    """Test that files and folders not named like workouts are ignored."""
+    # Arrange
+    temp_repo.save(make_workout(date(2025, 1, 9)))
+    user_dir = temp_repo.workouts_dir / "test_user"
+    (user_dir / "backup").mkdir()
+    (user_dir / "2025" / "01" / "notes.json").write_text("{}")
+    (user_dir / "2025" / "01" / "09.json.tmp").write_text("{}")
+    (user_dir / "2025" / "02").mkdir()
+    (user_dir / "2025" / "02" / "30.json").write_text("{}")
+
+    # Act
+    dates = LocalWorkoutRepository(base_dir=str(temp_repo.base_dir)).list_dates("test_user")
+
+    # Assert
+    assert dates == [date(2025, 1, 9)]
+
+def test_list_summaries(temp_repo):
+    """Test workout summaries follow saves, re-saves and deletes."""
+    # Arrange
+    for day, weight in [(5, 100), (6, 50), (7, 80), (6, 60)]:  # day 6 saved twice
+        sets = [Set(reps=10, weight_lbs=weight), Set(reps=8, weight_lbs=weight)]
+        temp_repo.save(make_workout(date(2025, 3, day), "Row", EquipmentType.CABLE, sets))
+
+    # Act
+    temp_repo.delete("test_user", date(2025, 3, 7))
+    summaries = temp_repo.list_summaries("test_user")
+
+    # Assert
+    assert [s["workout_date"] for s in summaries] == ["2025-03-05", "2025-03-06"]
+    assert summaries[1]["total_volume"] == 1080  # 18 reps * 60 lbs, from the re-save
+    assert summaries[1]["exercises"] == [
+        {"name": "Row", "num_sets": 2, "max_weight": 60, "total_reps": 18}
+    ]
+
+def test_list_summaries_rebuilds_missing_index(temp_repo):
+    """Test summaries are rebuilt from workout files when the index is missing."""
+    # Arrange - workouts saved before the index existed
+    temp_repo.save(make_workout(date(2025, 4, 1), "Squat", EquipmentType.BARBELL,
+                                [Set(reps=5, weight_lbs=200)]))
+    (temp_repo.workouts_dir / "test_user" / "index.jsonl").unlink()
+
+    # Act
+    summaries = temp_repo.list_summaries("test_user")
+
+    # Assert
+    assert len(summaries) == 1
+    assert summaries[0]["total_volume"] == 1000
+    assert (temp_repo.workouts_dir / "test_user" / "index.jsonl").exists()
+    assert temp_repo.list_summaries("nobody") == []
+
+def test_save_indexes_workouts_written_before_the_index(temp_repo):
+    """Test the first save without an index also indexes the user's older workout files."""
+    # Arrange - two workouts saved before the index existed
+    for day in [1, 2]:
+        temp_repo.save(make_workout(date(2025, 4, day)))
+    (temp_repo.workouts_dir / "test_user" / "index.jsonl").unlink()
+
+    # Act
+    temp_repo.save(make_workout(date(2025, 4, 3)))
+    summaries = temp_repo.list_summaries("test_user")
+
+    # Assert
+    assert [s["workout_date"] for s in summaries] == ["2025-04-01", "2025-04-02", "2025-04-03"]
+
+def test_list_summaries_rebuilds_unreadable_index(temp_repo):
+    """Test a torn index line (interrupted append) is repaired instead of failing listings."""
+    # Arrange
+    for day in [1, 2]:
+        temp_repo.save(make_workout(date(2025, 4, day)))
+    with open(temp_repo.workouts_dir / "test_user" / "index.jsonl", "ab") as f:
+        f.write(b'{"workout_date": "2025-04-0')
+    temp_repo.save(make_workout(date(2025, 4, 3)))  # appended onto the torn line
+
+    # Act
+    deleted = temp_repo.delete("test_user", date(2025, 4, 1))
+    summaries = temp_repo.list_summaries("test_user")
+
+    # Assert
+    assert deleted is True
+    assert [s["workout_date"] for s in summaries] == ["2025-04-02", "2025-04-03"]
+    index = (temp_repo.workouts_dir / "test_user" / "index.jsonl").read_bytes()
+    assert [orjson.loads(line)["workout_date"] for line in index.splitlines()] == [
+        "2025-04-02", "2025-04-03"
+    ]
+
+def test_saved_workout_includes_total_volume(temp_repo):
+    """Test total volume is stored in the workout file."""
+    # Arrange
+    workout = make_workout(date(2025, 5, 1), "Deadlift", EquipmentType.BARBELL,
+                           [Set(reps=5, weight_lbs=225), Set(reps=3, weight_lbs=245)])
+
+    # Act
+    file_path = temp_repo.save(workout)
+
+    # Assert
+    assert orjson.loads(Path(file_path).read_bytes())["total_volume"] == 1860
+
+def test_saved_copy_has_its_own_volumes(temp_repo):
+    """Test model_copy with new sets or exercises doesn't keep the original's derived values."""
+    # Arrange - read the originals' derived values first, as a response or summary would
+    workout = make_workout(date(2025, 5, 2), sets=[Set(reps=10, weight_lbs=50)])
+    exercise = workout.exercises[0]
+    assert (exercise.total_volume, exercise.reps_array, exercise.set_count) == (500, [10], 1)
+    assert (workout.total_volume, workout.exercise_count, workout.volume_achievement) == (500, 1, 1)
+    row = Exercise(name="Row", equipment=EquipmentType.CABLE,
+                   sets=[Set(reps=5, weight_lbs=20, goal_reps=10)])
+
+    # Act
+    exercise_copy = exercise.model_copy(
+        update={"sets": (Set(reps=1, weight_lbs=1), Set(reps=3, weight_lbs=1))}
+    )
+    workout_copy = workout.model_copy(update={"exercises": (exercise_copy, row)})
+    file_path = temp_repo.save(workout_copy)
+
+    # Assert
+    assert (exercise_copy.total_volume, exercise_copy.reps_array, exercise_copy.set_count) == (
+        4, [1, 3], 2
+    )
+    assert workout_copy.exercise_count == 2
+    assert workout_copy.volume_achievement == pytest.approx(104 / 204)
+    assert orjson.loads(Path(file_path).read_bytes())["total_volume"] == 104
+    [summary] = temp_repo.list_summaries("test_user")
+    assert (summary["total_volume"], summary["num_exercises"]) == (104, 2)
+
+def test_get_last_exercise_date(temp_repo):
+    """Test the last-saved date per exercise ignores older saves and falls back on deletes."""
+    # Arrange - saved out of order
+    for day, names in [(10, ["Squat", "Lunge"]), (12, ["Squat"]), (11, ["Squat", "Lunge"])]:
+        temp_repo.save(WorkoutLog(
+            workout_date=date(2025, 6, day),
             user_id="test_user",
             exercises=[
                 Exercise(
-                    name=f"Day {day} Exercise",
+                    name=name,
                     equipment=EquipmentType.BARBELL,
-                    sets=[Set(reps=8, weight_lbs=100)]
+                    sets=[Set(reps=5, weight_lbs=135)]
                 )
+                for name in names
             ]
-        )
-        temp_repo.save(workout)
-    
+        ))
+
     # Act
-    workouts = temp_repo.get_date_range(
-        "test_user",
-        start_date=date(2024, 12, 21),
-        end_date=date(2024, 12, 22)
+    temp_repo.delete("test_user", date(2025, 6, 12))
+
+    # Assert
+    assert temp_repo.get_last_exercise_date("test_user", "Lunge") == date(2025, 6, 11)
+    assert temp_repo.get_last_exercise_date("test_user", "Squat") == date(2025, 6, 11)
+    assert temp_repo.get_last_exercise_date("test_user", "Curl") is None
+
+def save_from_new_repository(base_dir, day):
+    """Save a one-exercise workout through a repository of its own, as an API worker would"""
+    LocalWorkoutRepository(base_dir=base_dir).save(make_workout(date(2025, 3, day), f"Move {day}"))
+
+@pytest.mark.skipif(sys.platform == "win32", reason="needs fork and fcntl file locks")
+def test_index_concurrent_saves_from_processes(temp_repo):
+    """Test saves from several processes all reach both index files."""
+    # Arrange - create the index files so every save updates them
+    temp_repo.save(make_workout(date(2025, 3, 1), "Move 1"))
+    days = range(2, 29)
+
+    # Act
+    with ProcessPoolExecutor(max_workers=4, mp_context=get_context("fork")) as pool:
+        list(pool.map(save_from_new_repository, [str(temp_repo.base_dir)] * len(days), days))
+
+    # Assert
+    summaries = temp_repo.list_summaries("test_user")
+    assert [s["workout_date"] for s in summaries] == [f"2025-03-{day:02d}" for day in range(1, 29)]
+    for day in range(1, 29):
+        assert temp_repo.get_last_exercise_date("test_user", f"Move {day}") == date(2025, 3, day)
+
+def test_index_lock_is_per_user(temp_repo):
+    """Test holding one user's index lock doesn't block another user's save."""
+    # Arrange
+    temp_repo.save(make_workout(date(2025, 3, 1), user_id="user_a"))
+
+    # Act - save for user_b while user_a's index is locked (e.g. during a rebuild)
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        with temp_repo._lock_index("user_a"):
+            future = pool.submit(temp_repo.save, make_workout(date(2025, 3, 2), user_id="user_b"))
+            future.result(timeout=10)
+
+    # Assert
+    assert temp_repo.list_dates("user_b") == [date(2025, 3, 2)]
+
+def test_index_without_file_locks(temp_repo, monkeypatch):
+    """Test the indexes still work where fcntl isn't available (Windows)."""
+    # Arrange
+    monkeypatch.setattr(local_workout_repository, "fcntl", None)
+
+    # Act
+    temp_repo.save(make_workout(date(2025, 3, 1), "Row"))
+    temp_repo.save(make_workout(date(2025, 3, 2), "Row"))
+    temp_repo.delete("test_user", date(2025, 3, 2))
+
+    # Assert
+    assert [s["workout_date"] for s in temp_repo.list_summaries("test_user")] == ["2025-03-01"]
+    assert temp_repo.get_last_exercise_date("test_user", "Row") == date(2025, 3, 1)
+    assert not (temp_repo.workouts_dir / "test_user" / "index.lock").exists()
+    assert temp_repo.list_summaries("nobody") == []
+
+def test_get_by_date_reflects_resave(temp_repo):
+    """Test a cached workout is replaced when the same date is saved again."""
+    # Arrange - cache the first version
+    workout_date = date(2025, 7, 1)
+    temp_repo.save(make_workout(workout_date, "Bench Press", EquipmentType.BARBELL,
+                                [Set(reps=10, weight_lbs=100)]))
+    before_resave = temp_repo.get_by_date("test_user", workout_date)
+    assert before_resave.total_volume == 1000
+
+    # Act
+    temp_repo.save(make_workout(workout_date, "Bench Press", EquipmentType.BARBELL,
+                                [Set(reps=10, weight_lbs=110)]))
+    after_resave = temp_repo.get_by_date("test_user", workout_date)
+    retrieved = temp_repo.get_by_date("test_user", workout_date)
+    in_range = temp_repo.get_date_range("test_user", workout_date, workout_date)
+
+    # Assert
+    assert after_resave.total_volume == 1100  # cache entry for the old file was dropped
+    assert retrieved is after_resave  # then served from cache
+    assert in_range == [retrieved]
+
+def test_get_by_date_round_trips_nested_models(temp_repo):
+    """Test a saved workout loads back with equal nested models and derived values."""
+    # Arrange
+    workout = WorkoutLog(
+        workout_date=date(2025, 8, 1),
+        user_id="test_user",
+        exercises=[
+            Exercise(
+                name="Press",
+                equipment=EquipmentType.DUMBBELL,
+                sets=[Set(reps=10, weight_lbs=30, goal_reps=12), Set(reps=8, weight_lbs=35)],
+                notes="heavy"
+            )
+        ],
+        notes="push day"
     )
-    
+    temp_repo.save(workout)
+
+    # Act
+    retrieved = temp_repo.get_by_date("test_user", date(2025, 8, 1))
+
     # Assert
-    assert len(workouts) == 2
-    assert workouts[0].workout_date == date(2024, 12, 21)
-    assert workouts[1].workout_date == date(2024, 12, 22)
\ No newline at end of file
+    assert retrieved == workout
+    assert retrieved.exercises[0].equipment is EquipmentType.DUMBBELL
+    assert retrieved.volume_achievement == workout.volume_achievement
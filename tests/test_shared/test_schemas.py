@@ -0,0 +1,70 @@
+"""Tests for the workout schemas' derived values"""
+from datetime import date
+
+import pytest
+
+from shared.schemas import EquipmentType, Exercise, Set, WorkoutLog
+
+def make_exercise(sets, name="Press"):
+    return Exercise(name=name, equipment=EquipmentType.DUMBBELL, sets=sets)
+
+@pytest.mark.parametrize("sets, has_goal, achievement", [
+    # no goals: goal volume falls back to the actual volume
+    ([Set(reps=10, weight_lbs=30), Set(reps=8, weight_lbs=30)], False, 1.0),
+    # goal reps only: 540 of 600
+    ([Set(reps=10, weight_lbs=30), Set(reps=8, weight_lbs=30, goal_reps=10)], True, 0.9),
+    # goal weight only: 300 of 400
+    ([Set(reps=10, weight_lbs=30, goal_weight_lbs=40)], True, 0.75),
+    # goals met exactly
+    ([Set(reps=10, weight_lbs=30, goal_reps=10, goal_weight_lbs=30)], True, 1.0),
+])
+def test_exercise_has_goal(sets, has_goal, achievement):
+    """Test has_goal and the volume achievement it short-circuits for an exercise."""
+    exercise = make_exercise(sets)
+
+    assert exercise.has_goal is has_goal
+    assert exercise.volume_achievement == pytest.approx(achievement)
+    assert exercise.volume_achievement == pytest.approx(
+        exercise.total_volume / exercise.goal_volume
+    )
+
+@pytest.mark.parametrize("goal_reps, has_goal, achievement", [
+    (None, False, 1.0),
+    # only the second exercise has a goal: 500 of 700 overall
+    (10, True, 500 / 700),
+])
+def test_workout_has_goal(goal_reps, has_goal, achievement):
+    """Test has_goal and the volume achievement it short-circuits for a whole workout."""
+    workout = WorkoutLog(
+        workout_date=date(2025, 8, 1),
+        user_id="test_user",
+        exercises=[
+            make_exercise([Set(reps=10, weight_lbs=30)]),
+            make_exercise([Set(reps=5, weight_lbs=40, goal_reps=goal_reps)], name="Row"),
+        ]
+    )
+
+    assert workout.has_goal is has_goal
+    assert workout.volume_achievement == pytest.approx(achievement)
+    assert workout.volume_achievement == pytest.approx(workout.total_volume / workout.goal_volume)
+
+def test_copy_recomputes_goal_values():
+    """Test goal values memoized on a model aren't carried into a copy with new fields."""
+    # Arrange - no goals, and the derived values read so they're memoized
+    exercise = make_exercise([Set(reps=10, weight_lbs=30)])
+    workout = WorkoutLog(workout_date=date(2025, 8, 1), user_id="test_user",
+                         exercises=[exercise])
+    assert (exercise.has_goal, exercise.goal_volume) == (False, 300)
+    assert (workout.has_goal, workout.goal_volume, workout.volume_achievement) == (False, 300, 1.0)
+
+    # Act - 300 of a 400 goal
+    goal_set = Set(reps=10, weight_lbs=30, goal_weight_lbs=40)
+    exercise_copy = exercise.model_copy(update={"sets": (goal_set,)})
+    workout_copy = workout.model_copy(update={"exercises": (exercise_copy,)})
+
+    # Assert
+    assert (exercise_copy.has_goal, exercise_copy.goal_volume) == (True, 400)
+    assert (workout_copy.has_goal, workout_copy.goal_volume) == (True, 400)
+    assert workout_copy.volume_achievement == pytest.approx(0.75)
+    # a copy without updates keeps the (still valid) memoized values
+    assert workout.model_copy().goal_volume == 300